@@ -2,15 +2,13 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
-import plotly.express as px
-from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+from datetime import datetime, timedelta, date
+from pathlib import Path
 import yfinance as yf
-import requests
-import pickle
 import joblib
-import os
+
+from numba_kernels import (lttb_indices, market_phases, rolling_mean2_1d,
+                           rolling_std_1d)
 
 # Page configuration
 st.set_page_config(
@@ -29,23 +27,192 @@ Este dashboard fornece uma análise abrangente dos preços do petróleo Brent, i
 - Forecast do preço do próximo dia
 """)
 
+def _write_cache(frame, cache_path):
+    """Grava o parquet do dia e recolhe os arquivos de dias anteriores."""
+    cache_path.parent.mkdir(exist_ok=True)
+    frame.to_parquet(cache_path)
+    for old in cache_path.parent.glob('brent_*.parquet'):
+        if old != cache_path:
+            old.unlink(missing_ok=True)
+
+def _canonical(frame):
+    """Formato canônico de saída do load_data: índice DatetimeIndex ordenado
+    e coluna petrol_price — o restante do app consome sem ramificações."""
+    frame = frame.copy()
+    frame['Date'] = pd.to_datetime(frame['Date'])
+    return frame.sort_values('Date').set_index('Date')
+
 # Function to load data
-@st.cache_data
+# TTL de 6h: o mercado fecha uma vez por dia útil, então não há motivo para
+# revalidar o download a cada sessão — dentro da janela tudo é cache hit
+@st.cache_data(ttl=21600)
 def load_data():
-    # Obter dados do Brent do yfinance
-    ticker = "BZ=F"  # Código do Brent 
-    data = yf.download(ticker, start="2010-01-01", end=datetime.now().strftime("%Y-%m-%d"))
-    # Diagnóstico
-    if data.empty:
-        st.error("❌ Falha ao carregar dados do Yahoo Finance")
-        raw_data_link = 'https://raw.githubusercontent.com/Gervic/brent-oil-dashboard-fiap-tech-challenge-fase4/refs/heads/main/petrol_price_data.csv'
-        raw_data = pd.read_csv(raw_data_link, sep=';')
-        brent_data = raw_data[['Date', 'petrol_price']]
-        brent_data['petrol_price'] = brent_data['petrol_price'].str.replace(',', '.').astype(float)
-        st.info('Dados carregados da base histórica disponível no Github')
-        return brent_data
-    else:
-        return data
+    # Cache em disco: o st.cache_data não sobrevive a um restart do processo,
+    # então persistimos o download do dia em parquet (leitura em ~ms, tipos nativos)
+    cache_path = Path(f".cache/brent_{date.today():%Y%m%d}.parquet")
+    if cache_path.exists():
+        return _canonical(pd.read_parquet(cache_path))
+
+    # Busca incremental: se há um parquet de um dia anterior, baixa apenas a
+    # cauda desde a última data gravada em vez do histórico completo desde 2010
+    ticker = "BZ=F"  # Código do Brent
+    cached = None
+    start = "2010-01-01"
+    previous = sorted(cache_path.parent.glob('brent_*.parquet'))
+    if previous:
+        cached = pd.read_parquet(previous[-1])
+        start = (cached['Date'].max() + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+
+    try:
+        # end fixado na data (não em datetime.now()) mantém a chave do
+        # st.cache_data estável ao longo do dia; as flags desligam o progress
+        # bar, o pool de threads multi-ticker e o merge de dividendos/splits,
+        # inúteis para um único índice de preço
+        data = yf.download(ticker, start=start, end=date.today().isoformat(),
+                           interval="1d", progress=False, threads=False,
+                           auto_adjust=False, actions=False, group_by='column')
+    except Exception:
+        # Erro de rede não é fatal: ainda temos o cache local e o CSV do Github
+        data = pd.DataFrame()
+    if not data.empty:
+        # Achata para Date/petrol_price (parquet não aceita as colunas
+        # MultiIndex do yfinance), mesmo formato do fallback de CSV
+        close = data['Close']
+        if isinstance(close, pd.DataFrame):  # colunas MultiIndex do yfinance novo
+            close = close.iloc[:, 0]
+        new_rows = close.rename('petrol_price').rename_axis('Date').reset_index()
+        if cached is not None:
+            new_rows = (pd.concat([cached, new_rows])
+                        .drop_duplicates(subset='Date')
+                        .sort_values('Date'))
+        _write_cache(new_rows, cache_path)
+        return _canonical(new_rows)
+
+    if cached is not None:
+        # Sem linhas novas (fim de semana/feriado) ou Yahoo fora do ar: o cache
+        # anterior já representa o estado mais recente
+        _write_cache(cached, cache_path)
+        return _canonical(cached)
+
+    raw_data_link = 'https://raw.githubusercontent.com/Gervic/brent-oil-dashboard-fiap-tech-challenge-fase4/refs/heads/main/petrol_price_data.csv'
+    try:
+        # decimal=',' deixa o parser C converter direto para float em uma
+        # passada, sem o str.replace + astype em Python; usecols evita até
+        # tokenizar as colunas que seriam descartadas logo em seguida
+        raw_data = pd.read_csv(raw_data_link, sep=';', decimal=',',
+                               usecols=['Date', 'petrol_price'],
+                               parse_dates=['Date'])
+    except Exception:
+        # Só mostra o banner vermelho quando todas as fontes falharam
+        st.error("❌ Falha ao carregar dados do Yahoo Finance e da base histórica do Github")
+        st.stop()
+    brent_data = raw_data[['Date', 'petrol_price']]
+    st.info('Dados carregados da base histórica disponível no Github')
+    return _canonical(brent_data)
+
+def _group_mean(values, keys):
+    """Média por grupo (ignorando NaN) para chaves inteiras já ordenadas.
+
+    Equivale a um resample().mean() em série regular, mas via
+    np.add.reduceat, sem o maquinário de DateOffset do pandas.
+    """
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0).astype(np.float64), starts)
+    counts = np.add.reduceat(valid.astype(np.float64), starts)
+    return sums / counts, starts
+
+# Funções de pré-processamento em cache: o Streamlit reexecuta o script inteiro
+# a cada interação, então separamos o que não depende dos sliders (compute_static)
+# do que depende (compute_mas) para que mexer nas médias móveis não recalcule
+# volatilidade, variações e médias mensais/anuais.
+@st.cache_data
+def compute_static(data):
+    """Deriva as colunas independentes dos sliders (dados já canônicos)."""
+    df = data.copy()
+    # float32 é precisão de sobra para um preço exibido com duas casas e corta
+    # pela metade o tráfego de memória de todas as janelas móveis; o mesmo
+    # buffer contíguo alimenta todos os cálculos sem novos .to_numpy()
+    df['petrol_price'] = df['petrol_price'].astype(np.float32)
+    price = df['petrol_price'].to_numpy()
+    df['volatility_30d'] = rolling_std_1d(price, 30)
+    # diff/pct_change direto em NumPy sobre o mesmo buffer: numérica idêntica,
+    # sem o dispatch genérico nem o preenchimento de NaN do pandas
+    change = np.empty_like(price)
+    change[0] = np.nan
+    np.subtract(price[1:], price[:-1], out=change[1:])
+    pct = np.empty_like(price)
+    pct[0] = np.nan
+    np.divide(price[1:], price[:-1], out=pct[1:])
+    pct[1:] -= 1.0
+    pct *= 100.0
+    df['price_change'] = change
+    df['price_pct_change'] = pct
+    # Médias mensais/anuais via chave inteira ordenada (ano*12+mês / ano),
+    # mantendo os rótulos de fim de período que o resample('M'/'Y') produzia
+    ym = df.index.year.values * 12 + df.index.month.values
+    m_means, m_starts = _group_mean(price, ym)
+    monthly_avg = pd.Series(
+        m_means,
+        index=pd.PeriodIndex(df.index[m_starts], freq='M').to_timestamp(how='end').normalize(),
+        name='petrol_price')
+    y_means, y_starts = _group_mean(price, df.index.year.values)
+    yearly_avg = pd.Series(
+        y_means,
+        index=pd.PeriodIndex(df.index[y_starts], freq='Y').to_timestamp(how='end').normalize(),
+        name='petrol_price')
+    # Últimos valores prontos para as métricas — evita indexações pandas por rerun
+    latest = {
+        'price': float(price[-1]),
+        'prev_price': float(price[-2]),
+        'vol_30d': float(df['volatility_30d'].iloc[-1]),
+        'mean_30d': float(price[-30:].mean()),
+    }
+    return df, monthly_avg, yearly_avg, latest
+
+@st.cache_data
+def identify_market_phases(series, threshold=0.2):
+    """Detecta ciclos de alta e baixa (movimentos >= threshold) na série.
+
+    Cacheado por conteúdo da série + threshold: a tabela de ciclos só muda
+    quando chega um mês novo, então quase todo rerun é um hit O(1).
+
+    A máquina de estados roda compilada em numba_kernels.market_phases; o
+    loop original em Python pagava um .iloc do pandas por ponto da série.
+    """
+    bull_idx, bear_idx = market_phases(series.to_numpy(np.float64), threshold)
+    dates = series.index
+    bull_markets = [(int(s), int(e), dates[s], dates[e]) for s, e in bull_idx]
+    bear_markets = [(int(s), int(e), dates[s], dates[e]) for s, e in bear_idx]
+    return bull_markets, bear_markets
+
+@st.cache_data
+def monthly_box_stats(df):
+    """Estatísticas do box plot sazonal pré-agregadas por mês-do-ano.
+
+    Envia 12 registros de quantis + os outliers ao navegador em vez dos
+    ~4000 pontos brutos que o plotly.js agregaria no cliente.
+    """
+    months = df.index.month.to_numpy()
+    price = df['petrol_price'].to_numpy(np.float64)
+    stats = np.empty((12, 5))
+    out_x = []
+    out_y = []
+    for m in range(1, 13):
+        vals = price[months == m]
+        q1, med, q3 = np.percentile(vals, [25, 50, 75])
+        iqr = q3 - q1
+        in_fence = vals[(vals >= q1 - 1.5 * iqr) & (vals <= q3 + 1.5 * iqr)]
+        stats[m - 1] = (q1, med, q3, in_fence.min(), in_fence.max())
+        outliers = vals[(vals < q1 - 1.5 * iqr) | (vals > q3 + 1.5 * iqr)]
+        out_x.extend([m] * len(outliers))
+        out_y.extend(outliers)
+    return stats, np.asarray(out_x), np.asarray(out_y)
+
+@st.cache_data
+def compute_mas(df, ma_short, ma_long):
+    """Médias móveis — recalculadas apenas quando os sliders mudam."""
+    return rolling_mean2_1d(df['petrol_price'].to_numpy(), ma_short, ma_long)
 
 # Load the data
 data = load_data()
@@ -71,114 +238,131 @@ events = {
     '2023-10-07': {'event': 'Conflito Israel-Hamas', 'desc': 'Início do conflito entre Israel e Hamas'}
 }
 
-with tab1:
+# Datas dos eventos pré-parseadas uma única vez no import — o loop de anotações
+# roda a cada rerun e não precisa reparsear as strings ISO nem buscar o índice
+# mais próximo evento a evento.
+EVENT_DATES = pd.to_datetime(list(events.keys()))
+EVENT_DATES_NS = EVENT_DATES.values.view('i8')
+EVENT_INFO = list(events.values())
+
+# Lendo e preparando os dados (cacheado — só roda quando os dados mudam)
+df, monthly_avg, yearly_avg, latest = compute_static(data)
+
+# Sidebar global — widgets de sidebar não podem viver dentro de fragmentos,
+# então aqui ficam apenas os controles que valem para o app inteiro
+st.sidebar.header('`Brent Oil Price Analytics`')
+st.sidebar.image("brent-oil-image.jpg", width=300)
+st.sidebar.info(f"Dados atualizados até: {df.index.max().strftime('%d/%m/%Y')}")
+
+# Selecionar tema
+st.sidebar.subheader("Configurações")
+theme = st.sidebar.selectbox("Tema", ["Claro", "Escuro"], index=0)
+
+# Aplicando tema
+if theme == "Escuro":
+    st.markdown("""
+    <style>
+    .stApp {
+        background-color: #121212;
+        color: white;
+    }
+    </style>
+    """, unsafe_allow_html=True)
+
+# Informações adicionais
+with st.sidebar.expander("Sobre"):
+    st.markdown("""
+    **Brent Price Oil Analytics** é uma plataforma de análise e previsão do preço do petróleo Brent.
+
+    Desenvolvida para auxiliar na tomada de decisões estratégicas baseadas em dados históricos e tendências futuras.
+
+    📧 [Contato para Suporte](email para:suporte@brent-analytics.com)
+    """)
+
+@st.fragment
+def render_trends(df, latest):
+    # Fragmento: mexer nos controles abaixo reexecuta apenas esta aba; o
+    # restante do app fica com o que já foi renderizado
     st.header("Tendências do preço do petróleo Brent")
 
-    # Lendo e preparando os dados
-    try:
-        df = data['Close'].reset_index().rename(columns={'BZ=F': 'petrol_price'})
-    except:
-        df = data.copy()
-    df['Date'] = pd.to_datetime(df['Date'])
-    df = df.sort_values(by='Date')
-    df = df.set_index('Date')
-
-    st.sidebar.header('`Brent Oil Price Analytics`')
-    st.sidebar.image("brent-oil-image.jpg", width=300)
-    st.sidebar.info(f"Dados atualizados até: {df.index.max().strftime('%d/%m/%Y')}")
-    ma50 = st.sidebar.slider("Média móvel curta (dias)", 10, 100, 50)
-    ma200 = st.sidebar.slider("Média móvel longa (dias)", 50, 300, 200)
-    
-     # Selecionar tema
-    st.sidebar.subheader("Configurações")
-    show_all_events = st.sidebar.checkbox("Mostrar no gráfico todos os eventos relevantes?", value=False)
-    theme = st.sidebar.selectbox("Tema", ["Claro", "Escuro"], index=0)
-    
-    # Aplicando tema
-    if theme == "Escuro":
-        st.markdown("""
-        <style>
-        .stApp {
-            background-color: #121212;
-            color: white;
-        }
-        </style>
-        """, unsafe_allow_html=True)
-    
-    # Informações adicionais
-    with st.sidebar.expander("Sobre"):
-        st.markdown("""
-        **Brent Price Oil Analytics** é uma plataforma de análise e previsão do preço do petróleo Brent.
-        
-        Desenvolvida para auxiliar na tomada de decisões estratégicas baseadas em dados históricos e tendências futuras.
-        
-        📧 [Contato para Suporte](email para:suporte@brent-analytics.com)
-        """)
+    ctrl1, ctrl2, ctrl3 = st.columns(3)
+    ma50 = ctrl1.slider("Média móvel curta (dias)", 10, 100, 50)
+    ma200 = ctrl2.slider("Média móvel longa (dias)", 50, 300, 200)
+    show_all_events = ctrl3.checkbox("Mostrar no gráfico todos os eventos relevantes?", value=False)
 
-    # Cálculos
-    df['volatility_30d'] = df['petrol_price'].rolling(window=30).std()
-    df['ma50'] = df['petrol_price'].rolling(window=ma50).mean()
-    df['ma200'] = df['petrol_price'].rolling(window=ma200).mean()
-    df['price_change'] = df['petrol_price'].diff()
-    df['price_pct_change'] = df['petrol_price'].pct_change() * 100
-    monthly_avg = df['petrol_price'].resample('M').mean()
-    yearly_avg = df['petrol_price'].resample('Y').mean()
+    # Cálculos dependentes dos sliders (as demais colunas já vêm de compute_static)
+    df['ma50'], df['ma200'] = compute_mas(df, ma50, ma200)
 
     st.markdown("### Métricas")
     col1, col2, col3, col4 = st.columns(4)
-    current_price = df['petrol_price'].iloc[-1]
-    prev_price = df['petrol_price'].iloc[-2]
+    current_price = latest['price']
+    prev_price = latest['prev_price']
     pct_change = (current_price - prev_price) / prev_price * 100
-    vol_30d = df['volatility_30d'].iloc[-1]
+    vol_30d = latest['vol_30d']
     
     col1.metric("Preço Atual", f"US$ {current_price:.2f}")
     col2.metric("Preço Anterior", f"US$ {prev_price:.2f}")
     col3.metric("%DoD", f"{pct_change:.2f}%")
-    col4.metric("Média 30 dias", f"US$ {df['petrol_price'].tail(30).mean():.2f}")
-          
+    col4.metric("Média 30 dias", f"US$ {latest['mean_30d']:.2f}")
+
+    # Reduz a resolução das séries enviadas ao navegador: ~1500 pontos bastam
+    # para um gráfico de ~1200px e o payload cai ~3x. Os mesmos índices (LTTB
+    # sobre o preço) são aplicados às médias móveis para manter o eixo alinhado;
+    # as métricas acima continuam usando a série completa.
+    ds_idx = lttb_indices(df.index.values.astype(np.float64),
+                          df['petrol_price'].to_numpy(np.float64), 1500)
+    ds_dates = df.index[ds_idx]
+
     fig = go.Figure()
-    # Preço do petróleo
-    fig.add_trace(go.Scatter(
-        x=df.index,
-        y=df['petrol_price'],
+    # Preço do petróleo — Scattergl renderiza via WebGL e recebe os arrays
+    # tipados direto (datetime64/float32), sem serializar float a float em JSON
+    fig.add_trace(go.Scattergl(
+        x=ds_dates.values,
+        y=df['petrol_price'].to_numpy()[ds_idx],
         mode='lines',
         name='Preço Brent (USD)',
         line=dict(color='#1f77b4', width=2)
     ))
     # Adicionando eventos importantes, se solicitado
     if show_all_events and events:
-        for date, info in events.items():
-            event_date = pd.to_datetime(date)
-            if event_date in df.index or (event_date >= df.index[0] and event_date <= df.index[-1]):
-                # Encontrar o valor y mais próximo para o evento
-                closest_date = df.index[df.index.get_indexer([event_date], method='nearest')[0]]
-                y_value = df.loc[closest_date, 'petrol_price']
-                
-                # Adicionar anotação do evento
-                fig.add_annotation(
-                    x=event_date,
-                    y=y_value,
-                    text=info['event'],
-                    showarrow=True,
-                    arrowhead=1,
-                    ax=0,
-                    ay=-40,
-                    bgcolor="black",
-                    opacity=0.8
-                )
+        # Busca vetorizada: um único searchsorted localiza todos os eventos de
+        # uma vez, em vez de um get_indexer(method='nearest') por evento no loop
+        # Comparações direto nos int64 de nanossegundos, com os limites do
+        # índice (já ordenado) lidos uma única vez fora de qualquer loop
+        index_ns = df.index.values.view('i8')
+        idx = np.clip(np.searchsorted(index_ns, EVENT_DATES_NS), 0, len(df) - 1)
+        event_prices = df['petrol_price'].to_numpy()[idx]
+        in_range = (EVENT_DATES_NS >= index_ns[0]) & (EVENT_DATES_NS <= index_ns[-1])
+        # Monta todas as anotações de uma vez: cada fig.add_annotation refaz o
+        # merge do layout internamente, então um único update_layout é mais barato
+        annotations = [
+            dict(
+                x=EVENT_DATES[pos],
+                y=event_prices[pos],
+                text=EVENT_INFO[pos]['event'],
+                showarrow=True,
+                arrowhead=1,
+                ax=0,
+                ay=-40,
+                bgcolor="black",
+                opacity=0.8
+            )
+            for pos in np.flatnonzero(in_range)
+        ]
+        fig.update_layout(annotations=annotations)
     
     # Médias móveis
-    fig.add_trace(go.Scatter(
-        x=df.index,
-        y=df['ma50'],
+    fig.add_trace(go.Scattergl(
+        x=ds_dates.values,
+        y=df['ma50'].to_numpy()[ds_idx],
         mode='lines',
         name=f'MM{ma50}',
         line=dict(color='green', dash='dash')
     ))
-    
-    fig.add_trace(go.Scatter(
-        x=df.index,
-        y=df['ma200'],
+
+    fig.add_trace(go.Scattergl(
+        x=ds_dates.values,
+        y=df['ma200'].to_numpy()[ds_idx],
         mode='lines',
         name=f'MM{ma200}',
         line=dict(color='red', dash='dot')
@@ -239,18 +423,38 @@ with tab1:
     elevou a demanda por petróleo como substituto do gás natural
     """)
  
-    df_monthly = df.copy()
-    df_monthly["month"] = df_monthly.index.month
-    df_monthly["year"] = df_monthly.index.year
-    
-    # Boxplot da sazonalidade mensal com Plotly Express
-    fig = px.box(df_monthly, x="month", y="petrol_price", points="outliers",
-                 labels={"month": "Mês", "petrol_price": "Preço (USD)"},
-                 category_orders={"month": list(range(1, 13))},
-                 title="Sazonalidade Mensal dos Preços do Petróleo Brent (2010-2025)")
-    
-    # Cálculo da média mensal
-    monthly_means = df_monthly.groupby("month")["petrol_price"].mean()
+    # Boxplot da sazonalidade mensal com quantis pré-agregados: o plotly.js
+    # recebe 12 registros prontos em vez de agregar ~4000 pontos no navegador
+    box_stats, out_x, out_y = monthly_box_stats(df)
+    fig = go.Figure()
+    fig.add_trace(go.Box(
+        x=list(range(1, 13)),
+        q1=box_stats[:, 0],
+        median=box_stats[:, 1],
+        q3=box_stats[:, 2],
+        lowerfence=box_stats[:, 3],
+        upperfence=box_stats[:, 4],
+        name="Distribuição mensal",
+        marker_color="#636efa"
+    ))
+    if out_x.size:
+        fig.add_trace(go.Scatter(
+            x=out_x,
+            y=out_y,
+            mode="markers",
+            marker=dict(color="#636efa", size=4, opacity=0.6),
+            name="Outliers",
+            showlegend=False
+        ))
+
+    # Cálculo da média mensal por mês-do-ano: dois bincounts O(n) no lugar do
+    # groupby; a Series indexada 1..12 preserva os acessos por número do mês
+    month_keys = df.index.month.to_numpy()
+    price_f8 = df['petrol_price'].to_numpy(np.float64)
+    monthly_means = pd.Series(
+        np.bincount(month_keys, weights=price_f8, minlength=13)[1:]
+        / np.bincount(month_keys, minlength=13)[1:],
+        index=np.arange(1, 13))
     
     # Adiciona linha de médias mensais
     fig.add_trace(go.Scatter(
@@ -287,7 +491,9 @@ with tab1:
     
     # Customizações de layout
     fig.update_layout(
+        title="Sazonalidade Mensal dos Preços do Petróleo Brent (2010-2025)",
         xaxis=dict(
+            title="Mês",
             tickmode="array",
             tickvals=list(range(1, 13)),
             ticktext=['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun',
@@ -321,14 +527,28 @@ with tab1:
     padrões sazonais.
     """)
 
-with tab2:
+with tab1:
+    render_trends(df, latest)
+
+@st.fragment
+def render_volatility(df, monthly_avg):
+    # Fragmento: quando uma interação nasce dentro de outro fragmento, o
+    # Streamlit reexecuta só aquele fragmento e este bloco fica intocado
     st.header("Volatilidade do preço do petróleo Brent")
     c1, c2 = st.columns(2)
     with c1:
+        # Downsample como no gráfico de preços; os 29 NaNs da janela inicial
+        # ficam fora do LTTB para não distorcer a seleção dos buckets
+        vol = df['volatility_30d'].to_numpy()
+        first_valid = 30 - 1
+        vol_idx = first_valid + lttb_indices(
+            df.index.values[first_valid:].astype(np.float64),
+            vol[first_valid:].astype(np.float64), 1500)
+
         fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=df.index,
-            y=df['volatility_30d'],
+        fig.add_trace(go.Scattergl(
+            x=df.index.values[vol_idx],
+            y=vol[vol_idx],
             mode='lines',
             name='30-Day Volatility',
             line=dict(color='#E74C3C')
@@ -367,62 +587,6 @@ with tab2:
         causadores de volatilidade no mercado petrolífero.
         """)
     with c2:
-        def identify_market_phases(series, threshold=0.2):
-          bull_markets = []
-          bear_markets = []
-          
-          # Initialize variables
-          in_bull = False
-          in_bear = False
-          start_idx = 0
-          peak = series.iloc[0]
-          trough = series.iloc[0]
-          
-          for i in range(1, len(series)):
-              current_price = series.iloc[i]
-              
-              # Check for bull market
-              if not in_bull and current_price >= trough * (1 + threshold):
-                  if in_bear:
-                      # End of bear market
-                      bear_markets.append((start_idx, i-1, series.index[start_idx], series.index[i-1], 
-                                            peak, trough, (trough - peak) / peak))
-                      in_bear = False
-                  
-                  # Start of bull market
-                  in_bull = True
-                  start_idx = i
-                  trough = current_price
-              
-              # Check for bear market
-              elif not in_bear and current_price <= peak * (1 - threshold):
-                  if in_bull:
-                      # End of bull market
-                      bull_markets.append((start_idx, i-1, series.index[start_idx], series.index[i-1], 
-                                          trough, peak, (peak - trough) / trough))
-                      in_bull = False
-                  
-                  # Start of bear market
-                  in_bear = True
-                  start_idx = i
-                  peak = current_price
-              
-              # Update peak and trough
-              if in_bull and current_price > peak:
-                  peak = current_price
-              elif in_bear and current_price < trough:
-                  trough = current_price
-          
-          # Handle the last phase
-          if in_bull:
-              bull_markets.append((start_idx, len(series)-1, series.index[start_idx], series.index[-1], 
-                                  trough, peak, (peak - trough) / trough))
-          elif in_bear:
-              bear_markets.append((start_idx, len(series)-1, series.index[start_idx], series.index[-1], 
-                                  peak, trough, (trough - peak) / peak))
-          
-          return bull_markets, bear_markets
-            
         # Use monthly average for market phase identification to reduce noise
         bull_markets, bear_markets = identify_market_phases(monthly_avg, threshold=0.2)
         
@@ -433,18 +597,29 @@ with tab2:
         fig.add_trace(go.Scatter(x=monthly_avg.index, y=monthly_avg.values,
                                  mode='lines', name='Preço Médio Mensal', line=dict(color='gray')))
         
-        # Regiões de Bull Markets (verde)
-        for start_idx, end_idx, start_date, end_date, *_ in bull_markets:
-            fig.add_vrect(x0=start_date, x1=end_date, fillcolor="green", opacity=0.2,
-                          line_width=0, annotation_text="Alta", annotation_position="top left")
-        
-        # Regiões de Bear Markets (vermelho)
-        for start_idx, end_idx, start_date, end_date, *_ in bear_markets:
-            fig.add_vrect(x0=start_date, x1=end_date, fillcolor="red", opacity=0.2,
-                          line_width=0, annotation_text="Baixa", annotation_position="top left")
-        
+        # Regiões de alta (verde) e baixa (vermelho): cada add_vrect reconstrói
+        # a tupla layout.shapes, ficando O(n²) com dezenas de ciclos — montamos
+        # as listas de shapes/annotations e aplicamos tudo num update_layout só
+        shapes = []
+        annotations = []
+        for phases, color, label in ((bull_markets, "green", "Alta"),
+                                     (bear_markets, "red", "Baixa")):
+            for start_idx, end_idx, start_date, end_date, *_ in phases:
+                shapes.append(dict(
+                    type="rect", xref="x", yref="y domain",
+                    x0=start_date, x1=end_date, y0=0, y1=1,
+                    fillcolor=color, opacity=0.2, line_width=0
+                ))
+                annotations.append(dict(
+                    x=start_date, y=1, xref="x", yref="y domain",
+                    text=label, showarrow=False,
+                    xanchor="left", yanchor="top"
+                ))
+
         # Layout
         fig.update_layout(
+            shapes=shapes,
+            annotations=annotations,
             title="Ciclos de Alta (verde) e Baixa (vermelho) - Preço do Petróleo Brent",
             xaxis_title="Data",
             yaxis_title="Preço (USD)",
@@ -482,11 +657,16 @@ with tab2:
         quedas geralmente são mais rápidas e acentuadas do que as recuperações, que
         costumam ser mais graduais.
         """)
+
+with tab2:
+    render_volatility(df, monthly_avg)
+
 with tab:
     # Carregando eventos importantes e insights
+    @st.cache_data
     def get_events_insights():
         """Retorna eventos importantes e seus insights"""
-        return {
+        insights = {
             'covid': {
                 'title': 'Pandemia de COVID-19 (2020)',
                 'date': '2020-03-11',
@@ -589,6 +769,13 @@ with tab:
                 'date_range': ['2010-01-01', '2025-05-02']
             }
         }
+        # Pré-parseia as datas uma única vez — o dicionário fica em cache e os
+        # loops de render não voltam a chamar pd.to_datetime por evento
+        for ev in insights.values():
+            ev['date'] = pd.to_datetime(ev['date']) if ev['date'] else None
+            ev['event_end'] = pd.to_datetime(ev['event_end']) if ev['event_end'] else None
+            ev['date_range'] = [pd.to_datetime(d) for d in ev['date_range']]
+        return insights
 
     def ensure_datetime_scalar(value):
         """Converte datas para um datetime.datetime escalar seguro para uso no Plotly"""
@@ -614,18 +801,18 @@ with tab:
     fig = go.Figure()
     
     # Adicionando linha para o preço
-    fig.add_trace(go.Scatter(
-        x=df.index,
-        y=df['petrol_price'],
+    fig.add_trace(go.Scattergl(
+        x=df.index.values,
+        y=df['petrol_price'].to_numpy(),
         mode='lines',
         name='Preço Brent',
         line=dict(color='royalblue', width=2)
     ))
-    
+
     # Adicionando marcadores para eventos importantes
     for key, event in events_insights.items():
-        if event['date']:  # Verifica se há uma data específica
-            event_date = pd.to_datetime(event['date'])
+        if event['date'] is not None:  # Verifica se há uma data específica
+            event_date = event['date']
             if event_date in df.index or (event_date >= df.index[0] and event_date <= df.index[-1]):
                 # Encontrar valor mais próximo
                 closest_idx = df.index.get_indexer([event_date], method='nearest')[0]
@@ -671,8 +858,8 @@ with tab:
     
     # Filtrando dados para o período do evento
     if selected_event['date_range']:
-        start_date = pd.to_datetime(selected_event['date_range'][0])
-        end_date = pd.to_datetime(selected_event['date_range'][1])
+        start_date = selected_event['date_range'][0]
+        end_date = selected_event['date_range'][1]
         event_df = df.loc[(df.index >= start_date) & (df.index <= end_date)]
         
         # Gráfico detalhado do período do evento
@@ -768,9 +955,10 @@ with tab:
     # Média anual com anotações
     st.subheader("Média Anual de Preços (2010-2025)")
     
-    # Calculando médias anuais
-    yearly_avg = df.resample('Y')['petrol_price'].mean()
-    yearly_volatility = df.resample('Y')['volatility_30d'].mean()
+    # Calculando médias anuais: o preço já vem agregado de compute_static;
+    # a volatilidade usa o mesmo agrupador por ano, sem repassar pelo resample
+    y_vol, _ = _group_mean(df['volatility_30d'].to_numpy(), df.index.year.values)
+    yearly_volatility = pd.Series(y_vol, index=yearly_avg.index)
     
     # Criando DataFrame para visualização
     yearly_df = pd.DataFrame({
@@ -854,15 +1042,25 @@ with tab3:
     st.header("Previsão do Preço do Petróleo Brent")
     @st.cache_resource
     def load_model():
-        return joblib.load('prophet_model_v2.pkl')    
+        return joblib.load('prophet_model_v2.pkl')
     model = load_model()
-    
+
+    # O predict do Prophet é o custo dominante da aba e não depende de nenhum
+    # widget das outras abas — em cache, sliders de tab1 não o reexecutam
+    # (_model fica fora da chave de hash; o objeto é estável via cache_resource)
+    @st.cache_data(show_spinner=False)
+    def run_forecast(_model, periods, last_date):
+        # last_date entra só como chave de cache: quando a série histórica
+        # ganhar dias novos a previsão antiga é invalidada
+        future_dates = _model.make_future_dataframe(periods=periods)
+        fcst = _model.predict(future_dates)
+        # Só as colunas consumidas ficam retidas no cache
+        return fcst[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+
     # Gerar previsão
-    future_dates = model.make_future_dataframe(periods=90)
-    forecast = model.predict(future_dates)
+    forecast = run_forecast(model, 90, df.index.max())
     
-    next_dt = (datetime.now() +  timedelta(days=1)) 
-    df_price = df['2025-05-01':]
+    next_dt = (datetime.now() +  timedelta(days=1))
     start_dt = pd.to_datetime("2025-05-01")
     forecast = (forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
                 .set_index('ds')
@@ -889,12 +1087,22 @@ with tab3:
     st.write("Previsão do preço em US$ para os próximos {} dias:".format(days))
     st.dataframe(df_to_display.rename(columns={'ds': 'data', 'yhat':'preço predito'}))
     
-    # Plotar previsão
+    # Plotar previsão: o histórico é recortado ao entorno do horizonte pedido
+    # (mínimo 90 dias) — 15 anos de série não ajudam a julgar uma previsão
+    # de poucos dias e só inflam o payload enviado ao navegador
+    hist_window = max(90, 3 * days)
+    df_price = df.iloc[-hist_window:]
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=df_price.index, y=df_price['petrol_price'], mode='lines', name='Histórico'))
     fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat'], mode='lines', name='Previsão'))
-    fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat_upper'], mode='lines', name='Limite superior', line=dict(dash='dot'), opacity=0.3))
-    fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat_lower'], mode='lines', name='Limite inferior', line=dict(dash='dot'), opacity=0.3))
+    # Intervalo de confiança como banda preenchida: um par de traces com
+    # fill='tonexty' no lugar das duas linhas pontilhadas independentes
+    fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat_upper'], mode='lines',
+                             line=dict(width=0), hoverinfo='skip', showlegend=False))
+    fig.add_trace(go.Scatter(x=forecast['ds'], y=forecast['yhat_lower'], mode='lines',
+                             line=dict(width=0), fill='tonexty',
+                             fillcolor='rgba(230, 126, 34, 0.2)',
+                             name='Intervalo de confiança'))
     
     fig.update_layout(title="Previsão do modelo vs Histórico", xaxis_title="Data", yaxis_title="Preço($)", template="plotly_white")
     st.plotly_chart(fig, use_container_width=True)
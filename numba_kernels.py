@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""Kernels Numba para as estatísticas móveis do dashboard.
+
+O pandas recalcula cada janela via o caminho genérico de rolling; aqui
+mantemos somas/estados correntes (adiciona o elemento que entra, remove o
+que sai), fazendo uma única passada O(N) independente do tamanho da janela.
+A semântica de NaN segue o rolling do pandas com min_periods=window:
+o resultado só é emitido quando a janela está completa e sem NaN.
+
+As assinaturas explícitas nos decoradores fazem a compilação acontecer no
+import do módulo (e não na primeira interação do usuário); com cache=True
+o binário é persistido em __pycache__, então só o primeiro boot de cada
+imagem paga o custo do compilador. O pycc (AOT clássico do Numba) está
+descontinuado, por isso a compilação eager + cache em disco é o caminho
+recomendado para eliminar a latência de JIT.
+"""
+
+import numpy as np
+from numba import njit
+
+
+# O preço circula como float32 no app; compilamos as duas especializações.
+@njit(["f8[:](f8[:], i8)", "f8[:](f4[:], i8)"], cache=True)
+def rolling_mean_1d(x, w):
+    """Média móvel de janela w com soma corrente (O(N))."""
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    run_sum = 0.0
+    nobs = 0
+    for i in range(n):
+        v = x[i]
+        if not np.isnan(v):
+            run_sum += v
+            nobs += 1
+        if i >= w:
+            old = x[i - w]
+            if not np.isnan(old):
+                run_sum -= old
+                nobs -= 1
+        if i >= w - 1 and nobs == w:
+            out[i] = run_sum / w
+    return out
+
+
+@njit(["f8[:](f8[:], i8)", "f8[:](f4[:], i8)"], cache=True)
+def rolling_std_1d(x, w):
+    """Desvio padrão móvel (ddof=1) com atualização de Welford.
+
+    Mantém média e M2 correntes para evitar o cancelamento numérico da
+    formulação soma/soma-de-quadrados.
+    """
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    mean = 0.0
+    m2 = 0.0
+    nobs = 0
+    for i in range(n):
+        v = x[i]
+        if not np.isnan(v):
+            nobs += 1
+            delta = v - mean
+            mean += delta / nobs
+            m2 += delta * (v - mean)
+        if i >= w:
+            old = x[i - w]
+            if not np.isnan(old):
+                nobs -= 1
+                if nobs > 0:
+                    delta = old - mean
+                    mean -= delta / nobs
+                    m2 -= delta * (old - mean)
+                else:
+                    mean = 0.0
+                    m2 = 0.0
+        if i >= w - 1 and nobs == w:
+            if m2 < 0.0:
+                m2 = 0.0
+            out[i] = np.sqrt(m2 / (w - 1))
+    return out
+
+
+@njit(["UniTuple(f8[:], 2)(f8[:], i8, i8)",
+       "UniTuple(f8[:], 2)(f4[:], i8, i8)"], cache=True)
+def rolling_mean2_1d(x, w_short, w_long):
+    """Duas médias móveis em uma única passada sobre o mesmo buffer.
+
+    As duas janelas dos sliders mudam na mesma interação; fundir os dois
+    cálculos evita trazer o array de preços da memória duas vezes — rolling
+    é limitado por banda de memória, não por aritmética.
+    """
+    n = x.shape[0]
+    out_s = np.full(n, np.nan)
+    out_l = np.full(n, np.nan)
+    sum_s = 0.0
+    sum_l = 0.0
+    nobs_s = 0
+    nobs_l = 0
+    for i in range(n):
+        v = x[i]
+        if not np.isnan(v):
+            sum_s += v
+            nobs_s += 1
+            sum_l += v
+            nobs_l += 1
+        if i >= w_short:
+            old = x[i - w_short]
+            if not np.isnan(old):
+                sum_s -= old
+                nobs_s -= 1
+        if i >= w_long:
+            old = x[i - w_long]
+            if not np.isnan(old):
+                sum_l -= old
+                nobs_l -= 1
+        if i >= w_short - 1 and nobs_s == w_short:
+            out_s[i] = sum_s / w_short
+        if i >= w_long - 1 and nobs_l == w_long:
+            out_l[i] = sum_l / w_long
+    return out_s, out_l
+
+
+@njit("UniTuple(i8[:, :], 2)(f8[:], f8)", cache=True)
+def market_phases(vals, threshold):
+    """Máquina de estados de ciclos de alta/baixa (movimentos >= threshold).
+
+    Mesma lógica do detector original em Python puro, mas indexando o array
+    diretamente em vez de pagar um .iloc do pandas por ponto. Retorna dois
+    arrays (n, 2) com os pares (início, fim) dos ciclos de alta e de baixa.
+    """
+    n = vals.shape[0]
+    bull = np.empty((n, 2), np.int64)
+    bear = np.empty((n, 2), np.int64)
+    n_bull = 0
+    n_bear = 0
+    in_bull = False
+    in_bear = False
+    start = 0
+    peak = vals[0]
+    trough = vals[0]
+    for i in range(1, n):
+        current = vals[i]
+        if not in_bull and current >= trough * (1.0 + threshold):
+            if in_bear:
+                bear[n_bear, 0] = start
+                bear[n_bear, 1] = i - 1
+                n_bear += 1
+                in_bear = False
+            in_bull = True
+            start = i
+            trough = current
+        elif not in_bear and current <= peak * (1.0 - threshold):
+            if in_bull:
+                bull[n_bull, 0] = start
+                bull[n_bull, 1] = i - 1
+                n_bull += 1
+                in_bull = False
+            in_bear = True
+            start = i
+            peak = current
+        if in_bull and current > peak:
+            peak = current
+        elif in_bear and current < trough:
+            trough = current
+    if in_bull:
+        bull[n_bull, 0] = start
+        bull[n_bull, 1] = n - 1
+        n_bull += 1
+    elif in_bear:
+        bear[n_bear, 0] = start
+        bear[n_bear, 1] = n - 1
+        n_bear += 1
+    return bull[:n_bull], bear[:n_bear]
+
+
+@njit("i8[:](f8[:], f8[:], i8)", cache=True)
+def lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets: índices dos pontos a preservar.
+
+    Reduz uma série a n_out pontos mantendo a forma visual — em cada bucket
+    fica o ponto que maximiza a área do triângulo com o ponto já escolhido e
+    a média do bucket seguinte.
+    """
+    n = x.shape[0]
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    out = np.empty(n_out, np.int64)
+    out[0] = 0
+    out[n_out - 1] = n - 1
+    every = (n - 2) / (n_out - 2)
+    a = 0
+    for i in range(n_out - 2):
+        # média do bucket seguinte: terceiro vértice do triângulo
+        next_start = int((i + 1) * every) + 1
+        next_end = int((i + 2) * every) + 1
+        if next_end > n:
+            next_end = n
+        avg_x = 0.0
+        avg_y = 0.0
+        for j in range(next_start, next_end):
+            avg_x += x[j]
+            avg_y += y[j]
+        cnt = next_end - next_start
+        avg_x /= cnt
+        avg_y /= cnt
+        # bucket atual: fica o ponto de maior área
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        max_area = -1.0
+        chosen = start
+        ax_ = x[a]
+        ay_ = y[a]
+        for j in range(start, end):
+            area = abs((ax_ - avg_x) * (y[j] - ay_) - (ax_ - x[j]) * (avg_y - ay_))
+            if area > max_area:
+                max_area = area
+                chosen = j
+        out[i + 1] = chosen
+        a = chosen
+    return out